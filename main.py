@@ -11,13 +11,20 @@ examples:
 """
 
 import argparse
+import io
+import json
 import os
 import re
 import sys
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from urllib.parse import urlparse, urljoin, urlencode
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util import make_headers
+from urllib3.util.retry import Retry
 
 # tqdm makes nice progress bars but works without it too
 try:
@@ -30,6 +37,41 @@ except ImportError:
 soundcloud_home = "https://soundcloud.com"
 soundcloud_api = "https://api-v2.soundcloud.com"
 client_id_cache = os.path.join(os.path.expanduser("~"), ".soundcloud_client_id")
+# don't bother re-checking a cached client id that worked less than this many seconds ago
+client_id_ttl = 3600
+
+# one pass finds client_id:"..", client_id = "..", "client_id":".." and client_id=..
+# the lookahead stops it from taking the first 32 characters of a longer token
+client_id_re = re.compile(r'client_id"?\s*[:=]\s*"?([0-9a-zA-Z]{32})(?![0-9a-zA-Z])')
+script_src_re = re.compile(r'<script[^>]+src="([^"]+)"')
+# characters windows/mac/linux won't take in a filename, mapped to None for str.translate
+bad_filename_chars = str.maketrans({c: None for c in '<>:"\\|?*' + "".join(chr(i) for i in range(32))})
+
+# how many playlist mp3 urls to look up / tracks to download at the same time
+max_parallel_resolves = 16
+max_parallel_downloads = 4
+
+# files at least this big get fetched as range_parts byte ranges in parallel
+min_range_split_size = 1024 * 1024 * 4
+range_parts = 4
+
+# hls segments fetched at once for tracks that have no plain mp3
+max_parallel_segments = 8
+
+# most track ids the /tracks endpoint takes in one call
+tracks_batch_size = 50
+
+# scripts scanned at once while hunting for a client id
+max_parallel_script_scans = 8
+
+# requests can't multiplex over http/2, so give every thread that can talk to the
+# same host at once its own keep-alive connection - otherwise urllib3 opens extra
+# ones past the pool size and throws them away, paying for a fresh tls handshake next time
+max_connections_per_host = max(
+    max_parallel_resolves,
+    max_parallel_downloads * max(range_parts, max_parallel_segments),
+    max_parallel_script_scans,
+)
 
 
 class SoundCloudError(Exception):
@@ -45,101 +87,167 @@ def debug(msg):
 
 def clean_filename(name):
     """make sure filenames work on windows/mac/linux"""
-    name = name.strip().replace("/", "-")
-    name = re.sub(r'[<>:"\\|?*\x00-\x1F]', "", name)
-    name = re.sub(r"\s+", " ", name).strip()
+    name = name.strip().replace("/", "-").translate(bad_filename_chars)
+    # split/join squashes any run of whitespace into one space and trims the ends
+    name = " ".join(name.split())
     return name or "audio"
 
 
-def get_cached_client_id():
-    """try to read client id from cache file"""
+def load_cache():
+    """read the json cache file, or start a fresh one"""
     try:
         if os.path.isfile(client_id_cache):
             with open(client_id_cache, "r", encoding="utf-8") as f:
-                cid = f.read().strip()
-                if cid:
-                    return cid
+                text = f.read().strip()
+            try:
+                cache = json.loads(text)
+            except ValueError:
+                # old cache files were just the bare client id
+                cache = {"cid": text, "ts": 0}
+            if isinstance(cache, dict):
+                return cache
+    except Exception:
+        pass
+    return {}
+
+
+def save_cache(cache):
+    """write the cache file, going through a temp file so it's never half written"""
+    tmp_path = client_id_cache + ".tmp"
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(cache, f)
+        os.replace(tmp_path, client_id_cache)
     except Exception:
         pass
-    return None
+
+
+def get_cached_client_id():
+    """try to read client id from cache file, returns (cid, when it was last checked)"""
+    cache = load_cache()
+    cid = (cache.get("cid") or "").strip()
+    if not cid:
+        return None, 0
+    return cid, cache.get("ts") or 0
 
 
 def save_client_id(cid):
-    """save client id for next time"""
+    """save client id for next time, remembering we just checked it"""
+    cache = load_cache()
+    cache["cid"] = cid.strip()
+    cache["ts"] = time.time()
+    save_cache(cache)
+
+
+def forget_client_id():
+    """drop the cached client id so the next run scrapes a fresh one"""
+    cache = load_cache()
+    if cache.pop("cid", None) is not None:
+        cache.pop("ts", None)
+        save_cache(cache)
+
+
+def get_cached_shortlink(url):
+    """where a shortlink pointed last time, if we know"""
+    return (load_cache().get("shortlinks") or {}).get(url)
+
+
+def save_shortlink(url, resolved_url):
+    """remember where a shortlink goes"""
+    cache = load_cache()
+    shortlinks = cache.get("shortlinks") or {}
+    shortlinks[url] = resolved_url
+    cache["shortlinks"] = shortlinks
+    save_cache(cache)
+
+
+def search_script(session, js_url, found):
+    """stream one javascript file looking for a client id, stop reading as soon as we see one"""
     try:
-        with open(client_id_cache, "w", encoding="utf-8") as f:
-            f.write(cid.strip())
+        debug(f"checking script: {js_url}")
+        with session.get(js_url, stream=True, timeout=15) as js_response:
+            if not js_response.ok:
+                return None
+            # keep the end of the previous chunk around so an id split across two chunks still matches
+            tail = ""
+            for chunk in js_response.iter_content(chunk_size=1024 * 64):
+                if found.is_set():
+                    return None  # another script already had it
+                # the id is plain ascii so latin-1 is a safe, never-failing decode
+                window = tail + chunk.decode("latin-1")
+                match = client_id_re.search(window)
+                if match and match.end() < len(window):
+                    found.set()
+                    return match.group(1)
+                # a match that runs into the end of the window could be the start of a longer
+                # token (the lookahead can't see past it), so hold on to it until the next chunk
+                keep_from = len(window) - 64
+                if match:
+                    keep_from = min(keep_from, match.start())
+                tail = window[max(keep_from, 0):]
+            # end of the file, so nothing more can follow whatever is left
+            match = client_id_re.search(tail)
+            if match:
+                found.set()
+                return match.group(1)
     except Exception:
         pass
+    return None
+
+
+def normalize_script_url(src):
+    """turn a script tag's src into a full url"""
+    if src.startswith("//"):
+        return "https:" + src
+    if src.startswith("http"):
+        return src
+    return urljoin(soundcloud_home, src)
 
 
 def find_client_id(session):
     """scrape soundcloud website to find a working client id"""
     debug("looking for client id in soundcloud scripts...")
-    r = session.get(soundcloud_home, timeout=15)
+    # grab the home page and a couple of other pages that might have different scripts all at once
+    pages = [soundcloud_home] + [urljoin(soundcloud_home, page) for page in ("/discover", "/charts/top")]
+    with ThreadPoolExecutor(max_workers=len(pages)) as pool:
+        futures = [pool.submit(session.get, page, timeout=15) for page in pages]
+
+    r = futures[0].result()
     r.raise_for_status()
     html = r.text
 
-    # find all script tags in the page
-    scripts = re.findall(r'<script[^>]+src="([^"]+)"', html)
-    script_urls = []
-    for s in scripts:
-        if s.startswith("//"):
-            script_urls.append("https:" + s)
-        elif s.startswith("http"):
-            script_urls.append(s)
-        else:
-            script_urls.append(urljoin(soundcloud_home, s))
-
-    # also check some other pages that might have different scripts
-    extra_pages = ["/discover", "/charts/top"]
-    for page in extra_pages:
+    # find all script tags in the pages
+    scripts = script_src_re.findall(html)
+    for future in futures[1:]:
         try:
-            rr = session.get(urljoin(soundcloud_home, page), timeout=15)
+            rr = future.result()
             if rr.ok:
-                more_scripts = re.findall(r'<script[^>]+src="([^"]+)"', rr.text)
-                for s in more_scripts:
-                    if s.startswith("//"):
-                        script_urls.append("https:" + s)
-                    elif s.startswith("http"):
-                        script_urls.append(s)
-                    else:
-                        script_urls.append(urljoin(soundcloud_home, s))
+                scripts += script_src_re.findall(rr.text)
         except Exception:
             pass
 
-    # remove duplicates
-    seen = set()
-    script_urls = [u for u in script_urls if not (u in seen or seen.add(u))]
-
-    # patterns that might find a client id
-    patterns = [
-        re.compile(r'client_id\s*:\s*"([0-9a-zA-Z]{32})"'),
-        re.compile(r'client_id\s*=\s*"([0-9a-zA-Z]{32})"'),
-        re.compile(r'"client_id"\s*:\s*"([0-9a-zA-Z]{32})"'),
-        re.compile(r'client_id=([0-9a-zA-Z]{32})')
-    ]
+    # make the urls absolute and drop duplicates, keeping page order
+    script_urls = list(dict.fromkeys(normalize_script_url(s) for s in scripts))
 
     # check the html first
-    for pattern in patterns:
-        match = pattern.search(html)
-        if match:
-            return match.group(1)
-
-    # then check the javascript files
-    for i, js_url in enumerate(script_urls[:20]):
-        try:
-            debug(f"checking script {i+1}/{min(20, len(script_urls))}: {js_url}")
-            js_response = session.get(js_url, timeout=15)
-            if not js_response.ok or not js_response.text:
-                continue
-            js_code = js_response.text
-            for pattern in patterns:
-                match = pattern.search(js_code)
-                if match:
-                    return match.group(1)
-        except Exception:
-            continue
+    match = client_id_re.search(html)
+    if match:
+        return match.group(1)
+
+    # then check the javascript files, a few at a time - first hit wins
+    candidates = script_urls[:20]
+    found = threading.Event()
+    pool = ThreadPoolExecutor(max_workers=max_parallel_script_scans)
+    try:
+        futures = [pool.submit(search_script, session, js_url, found) for js_url in candidates]
+        for future in as_completed(futures):
+            cid = future.result()
+            if cid:
+                return cid
+    finally:
+        # drop the scripts nobody has started fetching yet, the running ones see `found` and bail
+        found.set()
+        pool.shutdown(wait=False, cancel_futures=True)
 
     raise SoundCloudError("couldn't find a soundcloud client id. try again later.")
 
@@ -147,20 +255,23 @@ def find_client_id(session):
 def get_client_id(session):
     """get a working client id, from cache or by scraping"""
     def check_client_id_valid(cid):
-        """test if a client id actually works"""
+        """test if a client id actually works. only the status code matters
+        so the body is never parsed"""
         try:
-            url = f"{soundcloud_api}/search/tracks?{urlencode({'q': 'test', 'limit': 1, 'client_id': cid})}"
+            url = f"{soundcloud_api}/search/tracks?{urlencode({'q': 'a', 'limit': 1, 'client_id': cid})}"
             response = session.get(url, timeout=15)
-            if response.status_code in (401, 403):
-                return False
-            return response.ok
+            return 200 <= response.status_code < 300
         except Exception:
             return False
 
     # try cached id first
-    cached_id = get_cached_client_id()
+    cached_id, checked_at = get_cached_client_id()
+    if cached_id and time.time() - checked_at < client_id_ttl:
+        debug("using recently checked cached client id")
+        return cached_id
     if cached_id and check_client_id_valid(cached_id):
         debug("using cached client id")
+        save_client_id(cached_id)
         return cached_id
 
     debug("scraping for new client id...")
@@ -186,6 +297,8 @@ def api_request(session, url, params=None, allow_404=False):
         return response.json()
     except requests.exceptions.HTTPError:
         if response.status_code in (401, 403):
+            # we skip checking recently cached ids, so this is where a dead one gets noticed
+            forget_client_id()
             raise SoundCloudError("access denied - client id might be expired. try again.")
         raise
     except requests.exceptions.RequestException as e:
@@ -202,15 +315,30 @@ def resolve_soundcloud_url(session, client_id, url):
     return data
 
 
-def find_mp3_transcoding(track_data):
-    """look for a downloadable mp3 in the track data"""
+def fill_in_tracks(session, client_id, tracks):
+    """playlists only come back with the first few tracks filled in, the rest are
+    just ids. look those up in batches instead of one api call per track"""
+    missing = [track["id"] for track in tracks if "media" not in track and "id" in track]
+    full_tracks = {}
+    for i in range(0, len(missing), tracks_batch_size):
+        ids = ",".join(str(track_id) for track_id in missing[i:i + tracks_batch_size])
+        params = {"ids": ids, "client_id": client_id}
+        for track in api_request(session, f"{soundcloud_api}/tracks", params=params) or []:
+            full_tracks[track.get("id")] = track
+    # keep playlist order, laying the full data over whatever we had
+    return [{**track, **full_tracks.get(track.get("id"), {})} for track in tracks]
+
+
+def find_mp3_transcoding(track_data, wanted_protocol="progressive"):
+    """look for a downloadable mp3 in the track data, either one plain file
+    ("progressive") or a playlist of mp3 segments ("hls")"""
     media = track_data.get("media") or {}
     transcodings = media.get("transcodings") or []
     for transcode in transcodings:
         fmt = transcode.get("format") or {}
         mime_type = fmt.get("mime_type", "")
         protocol = fmt.get("protocol", "")
-        if "audio/mpeg" in mime_type and protocol == "progressive":
+        if "audio/mpeg" in mime_type and protocol == wanted_protocol:
             return transcode
     return None
 
@@ -221,9 +349,11 @@ def get_track_download_info(session, client_id, track_data):
     user = track_data.get("user") or {}
     artist = user.get("username", "").strip() or "Unknown Artist"
 
-    transcoding = find_mp3_transcoding(track_data)
+    # lots of tracks only come as hls nowadays, its segments are mp3 too so fall back to that
+    transcoding = find_mp3_transcoding(track_data) or find_mp3_transcoding(track_data, "hls")
     if not transcoding:
         return None  # no mp3 available for this track
+    protocol = transcoding["format"]["protocol"]
 
     # get the final mp3 url
     transcode_url = transcoding.get("url")
@@ -237,42 +367,247 @@ def get_track_download_info(session, client_id, track_data):
 
     # create a nice filename
     filename = clean_filename(f"{artist} - {title}") + ".mp3"
-    return {"url": mp3_url, "title": title, "artist": artist, "filename": filename}
+    return {"url": mp3_url, "protocol": protocol, "title": title, "artist": artist, "filename": filename}
+
+
+class Progress:
+    """byte counter for one download, safe to bump from several threads.
+    only redraws a few times a second so the chunk loops stay cheap"""
+
+    def __init__(self, label, total_size, enabled=True):
+        self.total_size = total_size
+        self.enabled = enabled
+        self.lock = threading.Lock()
+        self.pending = 0
+        self.downloaded = 0
+        self.next_flush = time.monotonic() + 0.25
+        self.bar = None
+        if enabled and has_tqdm and total_size:
+            self.bar = tqdm(total=total_size, unit="B", unit_scale=True, desc=label)
+
+    def add(self, n):
+        if not self.enabled:
+            return
+        with self.lock:
+            self.pending += n
+            now = time.monotonic()
+            if now >= self.next_flush:
+                self.flush()
+                self.next_flush = now + 0.25
+
+    def flush(self):
+        self.downloaded += self.pending
+        if self.bar:
+            self.bar.update(self.pending)
+        elif self.total_size:
+            percent = (self.downloaded / self.total_size) * 100
+            print(f"  {self.downloaded}/{self.total_size} bytes ({percent:.1f}%)", end="\r")
+        else:
+            print(f"  {self.downloaded} bytes", end="\r")
+        self.pending = 0
+
+    def close(self):
+        if not self.enabled:
+            return
+        with self.lock:
+            self.flush()
+        if self.bar:
+            self.bar.close()
+        else:
+            print()
+
 
+def check_stop(*stops):
+    """bail out of a download once any of the given events has been set (the run was called off)"""
+    if any(stop is not None and stop.is_set() for stop in stops):
+        raise SoundCloudError("download cancelled.")
+
+
+def write_all(fd, chunk, offset=None):
+    """raw writes may write less than asked, keep going until the whole chunk is out.
+    with an offset it writes there (pwrite) instead of at the current position"""
+    view = memoryview(chunk)
+    while view:
+        if offset is None:
+            written = os.write(fd, view)
+        else:
+            written = os.pwrite(fd, view, offset)
+            offset += written
+        view = view[written:]
+
+
+def preallocate(fd, total_size):
+    """reserve the whole file up front so the filesystem can lay it out in one go
+    instead of growing it a chunk at a time"""
+    if hasattr(os, "posix_fallocate"):
+        try:
+            os.posix_fallocate(fd, 0, total_size)
+            return
+        except OSError:
+            pass  # not every filesystem supports it
+    os.ftruncate(fd, total_size)
 
-def download_file(session, url, save_path):
-    """download a file with progress tracking"""
+
+def get_ranged_size(session, url):
+    """size of the file if the server lets us fetch it in pieces, otherwise None"""
+    try:
+        response = session.head(url, allow_redirects=True, timeout=10)
+        if not response.ok or response.headers.get("Accept-Ranges", "").lower() != "bytes":
+            return None
+        return int(response.headers.get("Content-Length", "0")) or None
+    except (requests.exceptions.RequestException, ValueError):
+        return None
+
+
+def download_range(session, url, fd, start, end, progress, stops=()):
+    """fetch bytes start..end (inclusive) and write them at the same spot in the file"""
+    headers = {"Range": f"bytes={start}-{end}"}
+    with session.get(url, headers=headers, stream=True, timeout=60) as response:
+        response.raise_for_status()
+        if response.status_code != 206:
+            raise SoundCloudError("server ignored our range request.")
+        offset = start
+        for chunk in response.iter_content(chunk_size=1024 * 256):
+            check_stop(*stops)
+            if chunk:
+                write_all(fd, chunk, offset)
+                offset += len(chunk)
+                progress.add(len(chunk))
+    if offset != end + 1:
+        raise SoundCloudError("download got cut off, try again.")
+
+
+def download_file_ranged(session, url, fd, label, total_size, show_progress=True, stop=None):
+    """download a file as several byte ranges at once, each over its own connection"""
+    progress = Progress(label, total_size, enabled=show_progress)
+    try:
+        preallocate(fd, total_size)
+        ranges = [
+            (i * total_size // range_parts, (i + 1) * total_size // range_parts - 1)
+            for i in range(range_parts)
+        ]
+        # set when this download is abandoned, so the parts still running stop at their next
+        # chunk instead of the pool exit waiting for every one of them to finish
+        abandoned = threading.Event()
+        stops = (stop, abandoned)
+        with ThreadPoolExecutor(max_workers=range_parts) as pool:
+            futures = [pool.submit(download_range, session, url, fd, start, end, progress, stops) for start, end in ranges]
+            try:
+                for future in as_completed(futures):
+                    future.result()
+            except BaseException:
+                # one part failed or ctrl-c
+                abandoned.set()
+                raise
+    finally:
+        progress.close()
+
+
+def download_file_stream(session, url, fd, label, show_progress=True, stop=None):
+    """download a file over a single connection, writing at the fd's current position"""
     with session.get(url, stream=True, timeout=60) as response:
         response.raise_for_status()
         total_size = int(response.headers.get("Content-Length", "0")) or None
-        chunk_size = 1024 * 64
-
-        if has_tqdm and total_size:
-            # fancy progress bar with tqdm
-            with tqdm(total=total_size, unit="B", unit_scale=True, desc=os.path.basename(save_path)) as progress_bar:
-                with open(save_path, "wb") as f:
-                    for chunk in response.iter_content(chunk_size=chunk_size):
-                        if chunk:
-                            f.write(chunk)
-                            progress_bar.update(len(chunk))
+        if total_size:
+            preallocate(fd, total_size)
+        progress = Progress(label, total_size, enabled=show_progress)
+        written = 0
+        try:
+            # big chunks mean fewer trips around the python loop per track
+            for chunk in response.iter_content(chunk_size=1024 * 256):
+                check_stop(stop)
+                if chunk:
+                    write_all(fd, chunk)
+                    written += len(chunk)
+                    progress.add(len(chunk))
+        finally:
+            progress.close()
+        if total_size and written < total_size:
+            # the rest of the preallocated file is just zeros, save_track throws it away
+            raise SoundCloudError("download got cut off, try again.")
+
+
+def download_file(session, url, fd, label, show_progress=True, stop=None):
+    """download a file into an open file descriptor with progress tracking, closes it when done.
+    setting `stop` makes it give up with an error at the next chunk"""
+    # unbuffered, the chunks are already big so each one goes straight to a single write()
+    with io.FileIO(fd, "wb", closefd=True):
+        # long mixes go faster split over a few connections, if the cdn allows it
+        total_size = get_ranged_size(session, url) if hasattr(os, "pwrite") else None
+        if total_size and total_size >= min_range_split_size:
+            try:
+                download_file_ranged(session, url, fd, label, total_size, show_progress=show_progress, stop=stop)
+            except (SoundCloudError, requests.exceptions.RequestException) as e:
+                check_stop(stop)
+                # said it does ranges but didn't really (200 instead of 206, short parts...),
+                # start over the plain way. pwrite never moved the fd position, it's still at 0
+                debug(f"ranged download failed ({e}), retrying as one stream")
+                os.ftruncate(fd, 0)
+                download_file_stream(session, url, fd, label, show_progress=show_progress, stop=stop)
         else:
-            # basic progress display
-            downloaded = 0
-            last_update = time.time()
-            with open(save_path, "wb") as f:
-                for chunk in response.iter_content(chunk_size=chunk_size):
-                    if chunk:
-                        f.write(chunk)
-                        downloaded += len(chunk)
-                        now = time.time()
-                        if now - last_update > 0.5:
-                            if total_size:
-                                percent = (downloaded / total_size) * 100
-                                print(f"  {downloaded}/{total_size} bytes ({percent:.1f}%)", end="\r")
-                            else:
-                                print(f"  {downloaded} bytes", end="\r")
-                            last_update = now
-            print()
+            download_file_stream(session, url, fd, label, show_progress=show_progress, stop=stop)
+
+
+def fetch_segment(session, url, stop=None):
+    """download one hls segment, picking up where it left off if the connection drops"""
+    data = bytearray()
+    for attempt in range(3):
+        headers = {"Range": f"bytes={len(data)}-"} if data else None
+        try:
+            with session.get(url, headers=headers, stream=True, timeout=30) as response:
+                response.raise_for_status()
+                if response.status_code != 206:
+                    data.clear()  # server sent the whole thing again
+                for chunk in response.iter_content(chunk_size=1024 * 64):
+                    check_stop(stop)
+                    data += chunk
+            return bytes(data)
+        except requests.exceptions.RequestException:
+            if attempt == 2:
+                raise
+            debug(f"segment download broke after {len(data)} bytes, resuming: {url}")
+
+
+def download_hls(session, playlist_url, fd, label, show_progress=True, stop=None):
+    """download every segment of an hls mp3 stream a few at a time and glue them
+    together in order - they're plain mp3 frames so the result is a normal mp3.
+    closes the file descriptor when done"""
+    with io.FileIO(fd, "wb", closefd=True):
+        response = session.get(playlist_url, timeout=20)
+        response.raise_for_status()
+        lines = [line.strip() for line in response.text.splitlines()]
+        if any(line.startswith("#EXT-X-KEY") and "METHOD=NONE" not in line for line in lines):
+            raise SoundCloudError("this track's stream is encrypted, can't download it.")
+        segment_urls = [urljoin(playlist_url, line) for line in lines if line and not line.startswith("#")]
+        if not segment_urls:
+            raise SoundCloudError("soundcloud gave us an empty stream.")
+
+        progress = Progress(label, None, enabled=show_progress)
+        pool = ThreadPoolExecutor(max_workers=max_parallel_segments)
+        try:
+            # map hands results back in playlist order, so they can be written as they arrive
+            for segment in pool.map(lambda url: fetch_segment(session, url, stop), segment_urls):
+                check_stop(stop)
+                write_all(fd, segment)
+                progress.add(len(segment))
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+            progress.close()
+
+
+def open_unique(base, ext):
+    """create base+ext, or "base (2)ext", "base (3)ext"... if it's taken.
+    O_EXCL makes the check and the create one step, so parallel downloads can't grab the same name.
+    O_BINARY matters on windows, otherwise the fd is in text mode and every \\n byte becomes \\r\\n"""
+    flags = os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, "O_BINARY", 0)
+    counter = 1
+    path = base + ext
+    while True:
+        try:
+            return os.open(path, flags, 0o644), path
+        except FileExistsError:
+            counter += 1
+            path = f"{base} ({counter}){ext}"
 
 
 def make_sure_dir_exists(path):
@@ -290,30 +625,86 @@ def is_valid_soundcloud_url(url):
         return False
 
 
-def download_track(session, client_id, track_data, output_dir):
-    """download a single track"""
-    track_info = get_track_download_info(session, client_id, track_data)
-    if not track_info:
-        title = track_data.get("title", "Unknown")
-        artist = (track_data.get("user") or {}).get("username", "Unknown")
-        print(f"skipping (no mp3 available): {artist} - {title}")
-        return False
+def skip_track(track_data):
+    """tell the user we're skipping a track that has no mp3"""
+    title = track_data.get("title", "Unknown")
+    artist = (track_data.get("user") or {}).get("username", "Unknown")
+    print(f"skipping (no mp3 available): {artist} - {title}")
+
 
-    save_path = os.path.join(output_dir, track_info["filename"])
-    
+def save_track(session, track_info, output_dir, show_progress=True, stop=None):
+    """download an already resolved track into output_dir"""
     # avoid overwriting files
-    base, ext = os.path.splitext(save_path)
-    counter = 2
-    while os.path.exists(save_path):
-        save_path = f"{base} ({counter}){ext}"
-        counter += 1
+    base, ext = os.path.splitext(os.path.join(output_dir, track_info["filename"]))
+    fd, save_path = open_unique(base, ext)
 
     print(f"downloading: {track_info['artist']} - {track_info['title']}")
-    download_file(session, track_info["url"], save_path)
+    label = os.path.basename(save_path)
+    try:
+        if track_info["protocol"] == "hls":
+            download_hls(session, track_info["url"], fd, label, show_progress=show_progress, stop=stop)
+        else:
+            download_file(session, track_info["url"], fd, label, show_progress=show_progress, stop=stop)
+    except BaseException:
+        # don't leave a half written mp3 lying around
+        try:
+            os.unlink(save_path)
+        except OSError:
+            pass
+        raise
     print(f"saved: {save_path}")
     return True
 
 
+def download_track(session, client_id, track_data, output_dir, show_progress=True):
+    """download a single track"""
+    track_info = get_track_download_info(session, client_id, track_data)
+    if not track_info:
+        skip_track(track_data)
+        return False
+    # same as download_playlist: anything still running in helper threads gives up once we're out
+    stop = threading.Event()
+    try:
+        return save_track(session, track_info, output_dir, show_progress=show_progress, stop=stop)
+    finally:
+        stop.set()
+
+
+def download_playlist(session, client_id, tracks, output_dir):
+    """download playlist tracks, returns how many made it"""
+    # two stages: lots of cheap api calls to get mp3 urls, and a few heavy
+    # downloads fed by them as soon as each url comes back
+    resolver = ThreadPoolExecutor(max_workers=max_parallel_resolves)
+    downloader = ThreadPoolExecutor(max_workers=max_parallel_downloads)
+    # tells downloads that are already running to give up (and clean up their file)
+    stop = threading.Event()
+    success_count = 0
+    try:
+        resolving = {
+            resolver.submit(get_track_download_info, session, client_id, track): track
+            for track in tracks
+        }
+        downloads = []
+        for future in as_completed(resolving):
+            track_info = future.result()
+            if not track_info:
+                skip_track(resolving[future])
+                continue
+            downloads.append(downloader.submit(save_track, session, track_info, output_dir, False, stop))
+
+        for i, future in enumerate(as_completed(downloads), start=1):
+            if future.result():
+                success_count += 1
+            print(f"[{i}/{len(downloads)}]")
+    finally:
+        # don't sit around finishing queued or running tracks if something blew up -
+        # the threads get joined at exit, so without `stop` we'd hang until they're done
+        stop.set()
+        resolver.shutdown(wait=False, cancel_futures=True)
+        downloader.shutdown(wait=False, cancel_futures=True)
+    return success_count
+
+
 def handle_download(session, client_id, resolved_data, output_dir):
     """handle either a single track or a playlist"""
     item_type = resolved_data.get("kind")
@@ -330,10 +721,8 @@ def handle_download(session, client_id, resolved_data, output_dir):
         total_count = len(tracks)
         if not total_count:
             raise SoundCloudError("this playlist has no tracks.")
-        for i, track in enumerate(tracks, start=1):
-            print(f"[{i}/{total_count}]")
-            if download_track(session, client_id, track, output_dir):
-                success_count += 1
+        tracks = fill_in_tracks(session, client_id, tracks)
+        success_count = download_playlist(session, client_id, tracks, output_dir)
 
     else:
         raise SoundCloudError(f"unsupported soundcloud type: {item_type}")
@@ -343,23 +732,46 @@ def handle_download(session, client_id, resolved_data, output_dir):
         print("some tracks were skipped (probably no mp3 available).")
 
 
-def fix_shortlink(url):
+def make_session():
+    """http session with realistic browser headers and a connection pool big enough for our threads"""
+    session = requests.Session()
+    session.headers.update({
+        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+                      "AppleWebKit/537.36 (KHTML, like Gecko) "
+                      "Chrome/124.0 Safari/537.36"
+    })
+    # ask for br/zstd too when the brotli/zstandard packages are installed - the js bundles
+    # we scan come out noticeably smaller. urllib3 only lists what it can actually decode
+    session.headers.update(make_headers(accept_encoding=True))
+    # keep connections alive between requests and retry the occasional flaky 5xx.
+    # raise_on_status=False hands the last bad response back so raise_for_status still deals with it
+    retry = Retry(total=3, backoff_factor=0.3, status_forcelist=[502, 503, 504], raise_on_status=False)
+    adapter = HTTPAdapter(pool_connections=32, pool_maxsize=max_connections_per_host, max_retries=retry)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def fix_shortlink(session, url):
     """convert soundcloud shortlinks to regular urls"""
     if "on.soundcloud.com" not in url:
         return url
+    cached_url = get_cached_shortlink(url)
+    if cached_url:
+        print(f"fixed shortlink → {cached_url}")
+        return cached_url
     try:
-        with requests.Session() as s:
-            s.max_redirects = 5
-            # try head first, then get if needed
-            response = s.head(url, allow_redirects=True, timeout=10)
-            if (not response.ok or "soundcloud.com" not in response.url) and response.is_redirect:
-                response = s.get(url, allow_redirects=True, timeout=10)
-            if response.ok and response.url and "soundcloud.com" in response.url:
-                print(f"fixed shortlink → {response.url}")
-                return response.url
-            else:
-                print("warning: couldn't fix shortlink, using original url")
-                return url
+        # try head first, then get if needed
+        response = session.head(url, allow_redirects=True, timeout=10)
+        if (not response.ok or "soundcloud.com" not in response.url) and response.is_redirect:
+            response = session.get(url, allow_redirects=True, timeout=10)
+        if response.ok and response.url and "soundcloud.com" in response.url:
+            print(f"fixed shortlink → {response.url}")
+            save_shortlink(url, response.url)
+            return response.url
+        else:
+            print("warning: couldn't fix shortlink, using original url")
+            return url
     except Exception as e:
         print(f"warning: shortlink fix failed ({e}), using original url")
         return url
@@ -384,8 +796,11 @@ def main():
             print("error: need a soundcloud url")
             sys.exit(2)
 
+    # made up front so the shortlink lookup already warms up the connection to soundcloud
+    session = make_session()
+
     url = args.url.strip()
-    url = fix_shortlink(url)
+    url = fix_shortlink(session, url)
 
     if not is_valid_soundcloud_url(url):
         print("error: please provide a valid soundcloud url")
@@ -393,14 +808,6 @@ def main():
 
     make_sure_dir_exists(args.output)
 
-    # set up http session with realistic browser headers
-    session = requests.Session()
-    session.headers.update({
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-                      "AppleWebKit/537.36 (KHTML, like Gecko) "
-                      "Chrome/124.0 Safari/537.36"
-    })
-
     try:
         client_id = get_client_id(session)
         resolved_data = resolve_soundcloud_url(session, client_id, url)